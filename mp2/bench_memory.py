@@ -0,0 +1,65 @@
+# Compares the memory used by BST (one Node object per key) with
+# CompactBST (parallel arrays) for the same keys and values.
+#
+#   python bench_memory.py [num_keys] [values_per_key]
+
+import random
+import sys
+import time
+import tracemalloc
+
+import search
+
+
+def measure(build):
+    # time without tracing (tracemalloc slows allocation down a lot),
+    # then build again to count memory
+    start = time.time()
+    build()
+    elapsed = time.time() - start
+
+    tracemalloc.start()
+    tree = build()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, used, elapsed
+
+
+def main():
+    num_keys = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    per_key = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    # interest-rate-like float keys; the values are shared ints so that
+    # only the index structure itself is counted
+    keys = [round(random.uniform(1, 10), 3) + i * 1e-7 for i in range(num_keys)]
+    items = [(key, j) for key in keys for j in range(per_key)]
+    random.shuffle(items)
+
+    def add_all(tree):
+        for key, val in items:
+            tree.add(key, val)
+        return tree
+
+    builds = [
+        ("BST.add", lambda: add_all(search.BST())),
+        ("BST.from_items", lambda: search.BST.from_items(items)),
+        ("CompactBST.add", lambda: add_all(search.CompactBST())),
+        ("CompactBST.add (typecode d)", lambda: add_all(search.CompactBST("d"))),
+        ("CompactBST.from_items (typecode d)",
+         lambda: search.CompactBST.from_items(items, "d")),
+    ]
+
+    print(f"{num_keys} keys, {len(items)} values")
+    baseline = None
+    for name, build in builds:
+        tree, used, elapsed = measure(build)
+        assert len(tree) == len(items)
+        if baseline is None:
+            baseline = used
+        print(f"{name:36} {used / 2**20:8.1f} MiB  {used / num_keys:6.0f} B/key"
+              f"  {baseline / used:5.2f}x smaller  {elapsed:6.2f}s")
+        del tree
+
+
+if __name__ == "__main__":
+    main()
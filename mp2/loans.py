@@ -2,9 +2,19 @@
 import json
 import zipfile
 import csv
+import functools
+from collections import Counter
 import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import search
 
 class Applicant:
+    # no per-object __dict__; races are a bitmask over race_lookup codes
+    __slots__ = ("age", "race_mask")
     
     race_lookup = {
         "1": "American Indian or Alaska Native",
@@ -24,13 +34,47 @@ class Applicant:
         "43": "Samoan",
         "44": "Other Pacific Islander"
     }
+    race_bits = {code: 1 << i for i, code in enumerate(race_lookup)}
+
+    race_sets = {}   # race_mask -> frozenset of race names
+    interned = {}    # (age, race_mask) -> shared Applicant
     
     def __init__(self, age, race):
         self.age = age
-        self.race = set()
+        self.race_mask = self.race_mask_of(race)
+
+    @classmethod
+    def race_mask_of(cls, race):
+        mask = 0
         for r in race:
-            if r in self.race_lookup:
-                self.race.add(self.race_lookup[r])
+            mask |= cls.race_bits.get(r, 0)
+        return mask
+
+    @classmethod
+    def intern(cls, age, race):
+        """Shared Applicant for this age and set of race codes. Loans use
+        these, so identical applicants cost one object; don't mutate them."""
+        return cls.from_mask(age, cls.race_mask_of(race))
+
+    @classmethod
+    def from_mask(cls, age, mask):
+        key = (age, mask)
+        applicant = cls.interned.get(key)
+        if applicant is None:
+            applicant = cls.__new__(cls)
+            applicant.age = age
+            applicant.race_mask = mask
+            cls.interned[key] = applicant
+        return applicant
+
+    @property
+    def race(self):
+        races = self.race_sets.get(self.race_mask)
+        if races is None:
+            races = frozenset(name for code, name in self.race_lookup.items()
+                              if self.race_mask & self.race_bits[code])
+            self.race_sets[self.race_mask] = races
+        return races
                 
     def __repr__(self):
         race_list = [race for race in self.race]
@@ -40,11 +84,18 @@ class Applicant:
         return self.lower_age() < other.lower_age()
     
     def lower_age(self):
-        age = self.age.replace('<', '').replace('>', '') 
-        if '-' in age:  
-            return int(age.split('-')[0])
-        else:
-            return int(age)
+        return parse_lower_age(self.age)
+
+
+@functools.lru_cache(maxsize=None)
+def parse_lower_age(age):
+    # only a handful of distinct age buckets exist, so each is parsed once
+    age = age.replace('<', '').replace('>', '') 
+    if '-' in age:  
+        return int(age.split('-')[0])
+    else:
+        return int(age)
+
     
 class Loan:
  
@@ -61,21 +112,18 @@ class Loan:
         return f"<Loan: {self.interest_rate}% on ${self.property_value} with {len(self.applicants)} applicant(s)>"
 
     def convert_to_float(self, value):
-        if value.lower() == "na" or value.lower() == "exempt":
-            return -1
-        else:
-            return float(value)
+        return to_float(value)
 
     def create_applicants(self, values):
         applicants = []
         applicant_age = values.get("applicant_age", "-1")
         applicant_race = [values.get(f"applicant_race-{i}", "-1") for i in range(1, 6)]
-        applicants.append(Applicant(applicant_age, applicant_race))
+        applicants.append(Applicant.intern(applicant_age, applicant_race))
 
         co_applicant_age = values.get("co-applicant_age", "-1")
         if co_applicant_age != "9999":
             co_applicant_race = [values.get(f"co-applicant_race-{i}", "-1") for i in range(1, 6)]
-            applicants.append(Applicant(co_applicant_age, co_applicant_race))
+            applicants.append(Applicant.intern(co_applicant_age, co_applicant_race))
         return applicants
     
     def yearly_amounts(self, yearly_payment):
@@ -91,19 +139,446 @@ class Loan:
             # TODO: subtract yearly payment from amt
             amt -= self.yearly_payment
 
+class LoanColumns:
+    """Struct-of-arrays storage for a list of loans.
+
+    Each Loan field is one NumPy column instead of an attribute on millions
+    of objects. Applicant ages are dictionary-encoded (codes into
+    age_labels, -1 for no co-applicant) and races are bitmasks over
+    Applicant.race_bits, with column 0 for the applicant and 1 for the
+    co-applicant.
+    NA/Exempt amounts, values and rates are -1 in their columns (as on
+    Loan, so the aggregates match) and also flagged in missing, one column
+    per field, since a parsed -1.0 must not come back as the NA sentinel.
+    Indexing still hands back a Loan, built on demand.
+    """
+
+    def __init__(self, loan_amount, property_value, interest_rate, num_applicants,
+                 age, age_labels, race, missing):
+        self.loan_amount = loan_amount
+        self.property_value = property_value
+        self.interest_rate = interest_rate
+        self.num_applicants = num_applicants
+        self.age = age
+        self.age_labels = age_labels
+        self.race = race
+        self.missing = missing
+
+    @classmethod
+    def parse_row(cls, values):
+        """One CSV row as a flat tuple, following the same rules as Loan."""
+        fields = [to_float(values.get(name, "-1"))
+                  for name in ("loan_amount", "property_value", "interest_rate")]
+        people = [("applicant", values.get("applicant_age", "-1"))]
+        co_applicant_age = values.get("co-applicant_age", "-1")
+        if co_applicant_age != "9999":
+            people.append(("co-applicant", co_applicant_age))
+
+        ages = [None, None]
+        races = [0, 0]
+        for j, (prefix, age) in enumerate(people):
+            ages[j] = age
+            for i in range(1, 6):
+                races[j] |= Applicant.race_bits.get(values.get(f"{prefix}_race-{i}", "-1"), 0)
+        return (*fields, len(people), *ages, *races)
+
+    @classmethod
+    def from_tuples(cls, tuples):
+        age_codes = {}
+        ages = []
+        for t in tuples:
+            for age in t[4:6]:
+                if age is None:
+                    ages.append(-1)
+                else:
+                    ages.append(age_codes.setdefault(age, len(age_codes)))
+
+        n = len(tuples)
+        columns = list(zip(*tuples)) if n else [()] * 8
+        return cls(np.array(columns[0], dtype=np.float64),
+                   np.array(columns[1], dtype=np.float64),
+                   np.array(columns[2], dtype=np.float64),
+                   np.array(columns[3], dtype=np.int8),
+                   np.array(ages, dtype=np.int32).reshape(n, 2),
+                   list(age_codes),
+                   np.array(columns[6:8], dtype=np.uint32).T.reshape(n, 2),
+                   # to_float gives the int -1 only for NA/Exempt
+                   np.array([[type(value) is int for value in t[:3]] for t in tuples],
+                            dtype=bool).reshape(n, 3))
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls.from_tuples([cls.parse_row(row) for row in rows])
+
+    def __len__(self):
+        return len(self.interest_rate)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("loan index out of range")
+
+        ages = [self.age_labels[code] if code >= 0 else None for code in self.age[i]]
+        fields = [-1 if missing else float(value)
+                  for value, missing in zip((self.loan_amount[i], self.property_value[i],
+                                             self.interest_rate[i]), self.missing[i])]
+        return self.make_loan((*fields, self.num_applicants[i], *ages, *self.race[i]))
+
+    @classmethod
+    def make_loan(cls, t):
+        """Turn a parse_row tuple back into a Loan."""
+        loan = Loan.__new__(Loan)
+        # already typed like Loan's: the int -1 for NA/Exempt, else a float
+        loan.loan_amount, loan.property_value, loan.interest_rate = t[:3]
+        loan.applicants = []
+        for j in range(t[3]):
+            loan.applicants.append(Applicant.from_mask(t[4 + j], int(t[6 + j])))
+        return loan
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @classmethod
+    def concat(cls, parts):
+        """One LoanColumns holding all the loans of parts, in order."""
+        labels = {}
+        ages = []
+        for part in parts:
+            # re-encode each part's age codes against the merged labels
+            codes = np.array([labels.setdefault(label, len(labels)) for label in part.age_labels] + [-1],
+                             dtype=np.int32)
+            ages.append(codes[part.age])
+        if not parts:
+            return cls.from_tuples([])
+        return cls(np.concatenate([part.loan_amount for part in parts]),
+                   np.concatenate([part.property_value for part in parts]),
+                   np.concatenate([part.interest_rate for part in parts]),
+                   np.concatenate([part.num_applicants for part in parts]),
+                   np.concatenate(ages),
+                   list(labels),
+                   np.concatenate([part.race for part in parts]),
+                   np.concatenate([part.missing for part in parts]))
+
+    def average_interest_rate(self):
+        if len(self) == 0:
+            return 0
+        return float(self.interest_rate.mean())
+
+    def total_applicants(self):
+        return int(self.num_applicants.sum(dtype=np.int64))
+
+    def ages_dict(self):
+        codes = self.age[self.age >= 0]
+        counts = np.bincount(codes, minlength=len(self.age_labels))
+        return dict(sorted((label, int(count))
+                           for label, count in zip(self.age_labels, counts) if count))
+
+
+class LoanStats:
+    """The totals behind Bank's aggregates, so they can be kept per
+    source and combined instead of rescanning every loan."""
+
+    def __init__(self, loans=0, rate_total=0, rate_count=0, applicants=0, ages=None):
+        self.loans = loans
+        self.rate_total = rate_total
+        self.rate_count = rate_count
+        self.applicants = applicants
+        self.ages = ages if ages is not None else Counter()
+
+    @classmethod
+    def of(cls, loans):
+        if isinstance(loans, LoanColumns):
+            return cls(len(loans), float(loans.interest_rate.sum()), len(loans),
+                       loans.total_applicants(), Counter(loans.ages_dict()))
+
+        stats = cls()
+        for loan in loans:
+            stats.loans += 1
+            if loan.interest_rate != None:
+                stats.rate_total += loan.interest_rate
+                stats.rate_count += 1
+            stats.applicants += len(loan.applicants)
+            for applicant in loan.applicants:
+                stats.ages[applicant.age] += 1
+        return stats
+
+    @classmethod
+    def total(cls, parts):
+        stats = cls()
+        for part in parts:
+            stats.loans += part.loans
+            stats.rate_total += part.rate_total
+            stats.rate_count += part.rate_count
+            stats.applicants += part.applicants
+            stats.ages.update(part.ages)
+        return stats
+
+    def average_interest_rate(self):
+        if self.rate_count == 0:
+            return 0
+        return self.rate_total / self.rate_count
+
+    def num_applicants(self):
+        return self.applicants / self.loans
+
+    def ages_dict(self):
+        return dict(sorted(self.ages.items()))
+
+
+class LoanSource:
+    """Loans read from one archive, with the fingerprint they were read at."""
+
+    def __init__(self, fingerprint, loans):
+        self.fingerprint = fingerprint
+        self.loans = loans
+        self.stats = LoanStats.of(loans)
+
+
+def zip_fingerprint(path):
+    """Cheap identity for an archive: member names, sizes and CRCs from the
+    zip's central directory, so nothing needs decompressing."""
+    with zipfile.ZipFile(path, 'r') as zip_file:
+        return tuple((info.filename, info.file_size, info.CRC)
+                     for info in zip_file.infolist())
+
+
+def concat_loans(parts):
+    if parts and all(isinstance(part, LoanColumns) for part in parts):
+        return LoanColumns.concat(parts)
+    return tuple(loan for part in parts for loan in part)
+
+
+def balance_after(principal, rate, payment, t):
+    """Closed-form balance after t years of Loan.yearly_amounts: interest
+    at rate percent is added, then the payment is subtracted, each year."""
+    r = rate / 100
+    growth = (1 + r) ** t
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(r == 0, t, (growth - 1) / np.where(r == 0, 1, r))
+    return principal * growth - payment * annuity
+
+
+def amortize(principal, rate, payment, years=None):
+    """Vectorized Loan.yearly_amounts over arrays of principals, rates
+    (percent, like Loan.interest_rate) and yearly payments.
+
+    Returns (payoff_years, balances). payoff_years[i] is how many amounts
+    yearly_amounts would yield for loan i, or inf when the payment never
+    covers the interest (where yearly_amounts would loop forever).
+    balances[i, t] is the balance at the start of year t, NaN once paid
+    off; it has `years` columns, by default enough for the slowest loan
+    that does get paid off.
+    """
+    principal, rate, payment = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64),
+        np.asarray(rate, dtype=np.float64),
+        np.asarray(payment, dtype=np.float64))
+    r = rate / 100
+
+    amortizing = (payment > 0) & (payment > r * principal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exact = np.where(r == 0, principal / payment,
+                         np.log(payment / (payment - r * principal)) / np.log1p(r))
+    payoff = np.ceil(np.where(amortizing, exact, 0))
+    # ceil() can land one year off when the balance hits 0 (almost) exactly
+    payoff -= (payoff > 0) & (balance_after(principal, rate, payment, payoff - 1) <= 0)
+    payoff += amortizing & (balance_after(principal, rate, payment, payoff) > 0)
+    payoff = np.where(principal <= 0, 0, np.where(amortizing, payoff, np.inf))
+
+    if years is None:
+        finite = payoff[np.isfinite(payoff)]
+        years = int(finite.max()) if finite.size else 0
+    t = np.arange(years)
+    balances = balance_after(principal[..., None], rate[..., None], payment[..., None], t)
+    balances[t >= payoff[..., None]] = np.nan
+    return payoff, balances
+
+
+def to_float(value):
+    if value.lower() == "na" or value.lower() == "exempt":
+        return -1
+    else:
+        return float(value)
+
+
+def scan_zip(path, leis):
+    """Yield (lei, row) for every row of the zipped HMDA CSV whose lei is
+    in leis, with row a dict like csv.DictReader gives.
+
+    Rows are filtered on the raw bytes of each line: with a single LEI a
+    substring test throws away other banks' rows before anything is
+    split, and otherwise only the lei column is cut out. Only the rows
+    that match are decoded and parsed as CSV. Fields must not contain
+    newlines (true of HMDA data).
+    """
+    with zipfile.ZipFile(path, 'r') as zip_file:
+        csv_filename = zip_file.namelist()[0]
+        with zip_file.open(csv_filename, 'r') as csv_file:
+            header = next(csv.reader([csv_file.readline().decode('utf-8')]), [])
+            yield from match_lines(csv_file, header, leis)
+
+
+def match_lines(lines, header, leis):
+    # the raw-bytes filter behind scan_zip, for any iterable of CSV lines
+    if 'lei' not in header:
+        return
+    col = header.index('lei')
+    wanted = {lei.encode("utf-8") for lei in leis}
+    needle = next(iter(wanted)) if len(wanted) == 1 else None
+
+    for line in lines:
+        if needle is not None and needle not in line:
+            continue
+        if b'"' in line:
+            # quoted fields may hide commas, so parse properly
+            row = next(csv.reader([line.decode('utf-8')]))
+            lei = row[col].encode('utf-8') if col < len(row) else None
+        else:
+            row = None
+            fields = line.rstrip(b'\r\n').split(b',', col + 1)
+            lei = fields[col] if col < len(fields) else None
+        if lei not in wanted:
+            continue
+        if row is None:
+            row = next(csv.reader([line.decode('utf-8')]))
+        yield lei.decode('utf-8'), dict(zip(header, row))
+
+
+def scan_zip_parallel(path, leis, processes):
+    """Like scan_zip, but returns a list of (lei, LoanColumns.parse_row(row))
+    built by a pool of worker processes. Workers send back those flat
+    tuples rather than Loan objects, which are much cheaper to pickle.
+
+    The CSV is decompressed once to a temporary file and cut into byte
+    ranges; each worker reads only its range, keeping the lines that start
+    inside it, so chunks meet exactly at line boundaries. Results come
+    back in file order.
+    """
+    leis = list(leis)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'loans.csv')
+        with zipfile.ZipFile(path, 'r') as zip_file:
+            with zip_file.open(zip_file.namelist()[0], 'r') as src:
+                with open(csv_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+
+        with open(csv_path, 'rb') as f:
+            header_line = f.readline()
+        header = next(csv.reader([header_line.decode('utf-8')]), [])
+
+        start = len(header_line)
+        size = os.path.getsize(csv_path)
+        step = max((size - start) // (processes * 4) + 1, 1 << 20)
+        chunks = [(csv_path, lo, min(lo + step, size), header, leis)
+                  for lo in range(start, size, step)]
+
+        results = []
+        with ProcessPoolExecutor(processes) as pool:
+            for part in pool.map(parse_chunk, chunks):
+                results.extend(part)
+        return results
+
+
+def parse_chunk(args):
+    csv_path, start, end, header, leis = args
+    with open(csv_path, 'rb') as f:
+        # back up one byte so a line starting exactly at start is kept
+        f.seek(start - 1)
+        f.readline()
+        lines = read_lines(f, end)
+        return [(lei, LoanColumns.parse_row(row))
+                for lei, row in match_lines(lines, header, leis)]
+
+
+def read_lines(f, end):
+    pos = f.tell()
+    while pos < end:
+        line = f.readline()
+        if not line:
+            return
+        pos += len(line)
+        yield line
+
+
+class BankRegistry:
+    """banks.json parsed once and indexed by name and by LEI. The file is
+    re-read only when its mtime changes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.by_name = {}
+        self.by_lei = {}
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self.mtime:
+            return self
+        with open(self.path, 'r') as file:
+            bank_data = json.load(file)
+
+        # first entry wins, like the old linear scan
+        by_name = {}
+        by_lei = {}
+        for bank_info in bank_data:
+            by_name.setdefault(bank_info['name'], bank_info)
+            by_lei.setdefault(bank_info['lei'], bank_info)
+        self.by_name, self.by_lei, self.mtime = by_name, by_lei, mtime
+        return self
+
+    def lei(self, name):
+        if name not in self.by_name:
+            raise ValueError(f"Bank '{name}' not found in the database.")
+        return self.by_name[name]['lei']
+
+    def name(self, lei):
+        if lei not in self.by_lei:
+            raise ValueError(f"LEI '{lei}' not found in the database.")
+        return self.by_lei[lei]['name']
+
+
+registries = {}
+
+
+def bank_registry(path='banks.json'):
+    key = os.path.abspath(path)
+    if key not in registries:
+        registries[key] = BankRegistry(key)
+    return registries[key].refresh()
+
+
+def lei_to_name(lei, path='banks.json'):
+    return bank_registry(path).name(lei)
+
+
 class Bank:
     
     def __init__(self, name):
-        with open('banks.json', 'r') as file:
-            bank_data = json.load(file)
-        
-        for bank_info in bank_data:
-            if bank_info['name'] == name:
-                self.name = name
-                self.lei = bank_info['lei']
-                return 
-        
-        raise ValueError(f"Bank '{name}' not found in the database.")
+        self.name = name
+        self.lei = bank_registry().lei(name)
+        self.sources = {}
+        self.stats = None
+        self._loans = ()
+
+    @classmethod
+    def from_lei(cls, lei):
+        return cls(lei_to_name(lei))
+
+    @property
+    def loans(self):
+        """All loans of all sources, in load order: a tuple (or a
+        LoanColumns), read-only so it can't drift from the running totals."""
+        return self._loans
+
+    @loans.setter
+    def loans(self, loans):
+        # loans set by hand become the bank's only source, with its own totals
+        self.sources = {}
+        self.add_source(None, None, loans)
         
     def __getitem__(self, key):
         return self.loans[key]
@@ -111,47 +586,105 @@ class Bank:
     def __len__(self):
         return len(self.loans)
 
-    def load_from_zip(self, path):
-        with zipfile.ZipFile(path, 'r') as zip_file:
-            csv_filename = zip_file.namelist()[0] 
-            with zip_file.open(csv_filename, 'r') as csv_file:
-                csv_reader = csv.DictReader(io.TextIOWrapper(csv_file, 'utf-8'))
-                
-                loans = []
-                
-                for row in csv_reader:
-                    if row.get('lei') == self.lei:
-                        loan = Loan(row)  
-                        loans.append(loan)
-                
-                self.loans = loans
+    def load_from_zip(self, path, columnar=False, processes=None):
+        self.sources = {}
+        self.append_from_zip(path, columnar, processes)
+
+    def append_from_zip(self, path, columnar=False, processes=None):
+        """Add this bank's loans from another archive (e.g. a new monthly
+        drop). An archive that was already loaded and hasn't changed is
+        skipped; one that has changed replaces its earlier loans, in place
+        in the load order. Loans assigned to bank.loans by hand count as
+        one more source and are kept. Returns whether anything was read."""
+        fingerprint = zip_fingerprint(path)
+        key = os.path.abspath(path)
+        source = self.sources.get(key)
+        if source is not None and source.fingerprint == fingerprint:
+            return False
+        self.add_source(key, fingerprint, self.read_zip(path, columnar, processes))
+        return True
+
+    def read_zip(self, path, columnar=False, processes=None):
+        if processes:
+            rows = [t for lei, t in scan_zip_parallel(path, {self.lei}, processes)]
+            if columnar:
+                return LoanColumns.from_tuples(rows)
+            return [LoanColumns.make_loan(t) for t in rows]
+        elif columnar:
+            rows = (row for lei, row in scan_zip(path, {self.lei}))
+            return LoanColumns.from_rows(rows)
+        else:
+            return list(self.iter_from_zip(path))
+
+    def add_source(self, key, fingerprint, loans):
+        if not isinstance(loans, LoanColumns):
+            loans = tuple(loans)
+        self.sources[key] = LoanSource(fingerprint, loans)
+        parts = [source.loans for source in self.sources.values()]
+        self._loans = parts[0] if len(parts) == 1 else concat_loans(parts)
+
+        # running totals: only the new source was scanned
+        self.stats = LoanStats.total(source.stats for source in self.sources.values())
+
+    def current_stats(self):
+        if self.stats is None:
+            return LoanStats.of(self.loans)
+        return self.stats
+
+    @classmethod
+    def load_many(cls, path, names, columnar=False, processes=None):
+        """Load several banks with a single pass over the zip, routing each
+        row by LEI. Returns a dict of name -> Bank. With processes, the
+        rows are parsed by that many worker processes."""
+        banks = {name: cls(name) for name in names}
+        loans = {name: [] for name in names}
+        by_lei = {}
+        for name, bank in banks.items():
+            by_lei.setdefault(bank.lei, []).append(loans[name])
+
+        parse = LoanColumns.parse_row if columnar else Loan
+        if processes:
+            for lei, t in scan_zip_parallel(path, by_lei, processes):
+                for bank_loans in by_lei[lei]:
+                    bank_loans.append(t if columnar else LoanColumns.make_loan(t))
+        else:
+            for lei, row in scan_zip(path, by_lei):
+                for bank_loans in by_lei[lei]:
+                    bank_loans.append(parse(row))
+
+        fingerprint = zip_fingerprint(path)
+        for name, bank in banks.items():
+            bank_loans = LoanColumns.from_tuples(loans[name]) if columnar else loans[name]
+            bank.add_source(os.path.abspath(path), fingerprint, bank_loans)
+        return banks
+
+    def iter_from_zip(self, path):
+        """Yield this bank's loans from the zipped HMDA CSV one at a time,
+        so even a statewide file is scanned in constant memory."""
+        for lei, row in scan_zip(path, {self.lei}):
+            yield Loan(row)
                 
+    def index(self, attr="interest_rate"):
+        """Balanced BST of this bank's loans keyed on a Loan attribute.
+        Save it with search.save_index and reopen with search.DiskBST to
+        skip the rebuild on later runs."""
+        return search.BST.from_items((getattr(loan, attr), loan) for loan in self.loans)
+
+    def amortize(self, yearly_payment, years=None):
+        """Payoff years and balance schedules for every loan at once; see
+        loans.amortize."""
+        if isinstance(self.loans, LoanColumns):
+            principal, rate = self.loans.loan_amount, self.loans.interest_rate
+        else:
+            principal = [loan.loan_amount for loan in self.loans]
+            rate = [loan.interest_rate for loan in self.loans]
+        return amortize(principal, rate, yearly_payment, years)
+
     def average_interest_rate(self):
-        total_interest_rate = 0
-        count = 0
-        for loan in self.loans:
-            if loan.interest_rate != None:
-                total_interest_rate += loan.interest_rate
-                count += 1
-        
-        if count == 0:
-            return 0
-        
-        return total_interest_rate / count
+        return self.current_stats().average_interest_rate()
     
     def num_applicants(self):
-        total_applicants = sum(len(loan.applicants) for loan in self.loans)
-        total_loans = len(self.loans)
-        return total_applicants / total_loans
+        return self.current_stats().num_applicants()
     
     def ages_dict(self):
-        age_dict = {}
-        
-        for loan in self.loans:
-            for applicant in loan.applicants:
-                if applicant.age not in age_dict:
-                    age_dict[applicant.age] = 0
-                age_dict[applicant.age] += 1
-        
-        sorted_age_dict = dict(sorted(age_dict.items()))
-        return sorted_age_dict
\ No newline at end of file
+        return self.current_stats().ages_dict()
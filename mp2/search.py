@@ -1,17 +1,23 @@
+import bisect
+import math
+import mmap
+import pickle
+import struct
+from array import array
+
+
 class Node():
     def __init__(self, key):
         self.key = key
         self.values = []
         self.left = None
         self.right = None
+        # subtree totals, kept up to date by the tree on every add
+        self.size = 0   # values stored in this subtree
+        self.count = 1  # nodes (distinct keys) in this subtree
         
     def __len__(self):
-        size = len(self.values)
-        if self.left is not None:
-            size += len(self.left)
-        if self.right is not None:
-            size += len(self.right)  
-        return size
+        return self.size
     
     def lookup(self, key):
         if key == self.key:
@@ -22,10 +28,51 @@ class Node():
             return self.right.lookup(key)
         else:
             return []
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+def _count(node):
+    return node.count if node is not None else 0
+
+
+def _fix_counts(node):
+    node.size = len(node.values) + _size(node.left) + _size(node.right)
+    node.count = 1 + _count(node.left) + _count(node.right)
+
         
 class BST():
+    node_class = Node
+
     def __init__(self):
         self.root = None
+
+    @classmethod
+    def from_items(cls, items):
+        """Build a perfectly balanced tree from (key, value) pairs in one
+        sort plus a linear pass. Values for duplicate keys keep their input
+        order, same as repeated add() calls."""
+        nodes = []
+        for key, val in sorted(items, key=lambda item: item[0]):
+            if not nodes or nodes[-1].key != key:
+                nodes.append(cls.node_class(key))
+            nodes[-1].values.append(val)
+
+        tree = cls()
+        tree.root = tree._build(nodes, 0, len(nodes))
+        return tree
+
+    def _build(self, nodes, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = nodes[mid]
+        node.left = self._build(nodes, lo, mid)
+        node.right = self._build(nodes, mid + 1, hi)
+        _fix_counts(node)
+        return node
         
     def __dump(self, node):
         if node == None:
@@ -40,24 +87,76 @@ class BST():
         else:
             return []
 
+    def __len__(self):
+        return _size(self.root)
+
     def dump(self):
         self.__dump(self.root)
 
+    def __iter__(self):
+        for node in self._walk():
+            yield node.key
+
+    def __reversed__(self):
+        for node in self._walk(reverse=True):
+            yield node.key
+
+    def items(self, reverse=False):
+        for node in self._walk(reverse=reverse):
+            yield node.key, node.values
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """Yield the values for every key with lo <= key <= hi, in key
+        order (descending if reverse). Either bound may be None."""
+        for node in self._walk(lo, hi, reverse):
+            yield from node.values
+
+    def _walk(self, lo=None, hi=None, reverse=False):
+        # in-order walk with an explicit stack (at most one node per level);
+        # subtrees that fall entirely outside [lo, hi] are never entered
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                if not reverse and lo is not None and node.key < lo:
+                    node = node.right
+                elif reverse and hi is not None and node.key > hi:
+                    node = node.left
+                else:
+                    stack.append(node)
+                    node = node.right if reverse else node.left
+
+            if not stack:
+                return
+            node = stack.pop()
+            if not reverse and hi is not None and node.key > hi:
+                return
+            if reverse and lo is not None and node.key < lo:
+                return
+            yield node
+            node = node.left if reverse else node.right
+
     def add(self, key, val):
+        created = False
         if self.root == None:
             self.root = Node(key)
+            created = True
 
+        path = []
         curr = self.root
         while True:
+            path.append(curr)
             if key < curr.key:
                 # go left
                 if curr.left == None:
                     curr.left = Node(key)
+                    created = True
                 curr = curr.left
             elif key > curr.key:
                 # go right
                 if curr.right == None:
                     curr.right = Node(key)
+                    created = True
                 curr = curr.right
             else:
                 # found it!
@@ -65,6 +164,10 @@ class BST():
                 break
 
         curr.values.append(val)
+        for node in path:
+            node.size += 1
+            if created and node is not curr:
+                node.count += 1
     
     def get_height(self, node):
         if node == None:
@@ -77,22 +180,7 @@ class BST():
     
     
     def num_nodes(self, node=None):
-        if self.root is None:
-            return 0
-    
-        stack = [self.root]
-        count = 0
-
-        while stack:
-            node = stack.pop()
-            count += 1
-
-            if node.left is not None:
-                stack.append(node.left)
-            if node.right is not None:
-                stack.append(node.right)
-    
-        return count
+        return _count(self.root)
     
     def num_nonleaf_nodes(self, node=None):
         if node is None:
@@ -114,21 +202,579 @@ class BST():
         return total_nodes - non_leaf_nodes
     
     def find_keys(self, n):
-        stack = []
-        visited = []
+        """Return the n-th largest key (the smallest key if n is out of
+        range, None for an empty tree)."""
+        if self.root is None:
+            return None
+        if n < 1 or n > self.root.count:
+            n = self.root.count
+
+        node = self.root
+        while True:
+            right = _count(node.right)
+            if n <= right:
+                node = node.right
+            elif n == right + 1:
+                return node.key
+            else:
+                n -= right + 1
+                node = node.left
+
+    def rank(self, key):
+        """Number of values stored under keys smaller than key."""
+        below = 0
+        node = self.root
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                below += _size(node.left) + len(node.values)
+                node = node.right
+            else:
+                return below + _size(node.left)
+        return below
+
+    def select(self, i):
+        """Key of the i-th smallest value (0-based, counting duplicates)."""
+        if i < 0:
+            i += len(self)
+        node = self.root
+        while node is not None:
+            left = _size(node.left)
+            if i < left:
+                node = node.left
+            elif i < left + len(node.values):
+                return node.key
+            else:
+                i -= left + len(node.values)
+                node = node.right
+        raise IndexError("BST index out of range")
+
+    def percentile(self, p):
+        """Nearest-rank p-th percentile (0 <= p <= 100) of the keys,
+        weighted by how many values each key holds."""
+        if not 0 <= p <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if self.root is None:
+            return None
+        k = math.ceil(p / 100 * len(self))
+        return self.select(max(k, 1) - 1)
+    
+class AVLNode(Node):
+    def __init__(self, key):
+        super().__init__(key)
+        self.height = 1
+
+
+def _height(node):
+    return node.height if node is not None else 0
+
+
+def _fix_height(node):
+    node.height = max(_height(node.left), _height(node.right)) + 1
+    _fix_counts(node)
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _fix_height(node)
+    _fix_height(pivot)
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _fix_height(node)
+    _fix_height(pivot)
+    return pivot
+
+
+def _rebalance(node):
+    _fix_height(node)
+    balance = _height(node.left) - _height(node.right)
+    if balance > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+class AVLTree(BST):
+    """BST that rebalances on every add, so the height stays O(log n)
+    even when keys arrive already sorted (e.g. interest rates)."""
+    node_class = AVLNode
+
+    def _build(self, nodes, lo, hi):
+        node = super()._build(nodes, lo, hi)
+        if node is not None:
+            _fix_height(node)
+        return node
+
+    def add(self, key, val):
+        path = []
+        curr = self.root
+        while curr is not None:
+            if key == curr.key:
+                curr.values.append(val)
+                for node in path:
+                    node.size += 1
+                curr.size += 1
+                return
+            path.append(curr)
+            curr = curr.left if key < curr.key else curr.right
+
+        node = AVLNode(key)
+        node.values.append(val)
+        node.size = 1
+        if not path:
+            self.root = node
+            return
+        if key < path[-1].key:
+            path[-1].left = node
+        else:
+            path[-1].right = node
+
+        # walk back up, fixing heights and rotating where needed
+        for i in range(len(path) - 1, -1, -1):
+            curr = path[i]
+            new = _rebalance(curr)
+            if new is curr:
+                continue
+            if i == 0:
+                self.root = new
+            elif path[i - 1].left is curr:
+                path[i - 1].left = new
+            else:
+                path[i - 1].right = new
+
+
+class CompactBST():
+    """Array-backed BST with the same API as BST.
+
+    Instead of one Python object (plus a __dict__ and a values list) per
+    key, node i lives at position i of a handful of parallel arrays: keys,
+    left/right child indices (-1 for none) and subtree size/count. All
+    values share one flat list; each node's values are a chain of slots
+    through it (first/last slot per node, next slot per value), so add()
+    still works without resizing anything. Pass typecode="d" to also store
+    float keys (e.g. interest rates) unboxed.
+    """
+
+    def __init__(self, typecode=None):
+        self.keys = array(typecode) if typecode else []
+        self.left = array("q")
+        self.right = array("q")
+        self.size = array("q")
+        self.count = array("q")
+        self.first = array("q")
+        self.last = array("q")
+        self.values = []
+        self.next = array("q")
+        self.root = -1
+
+    @classmethod
+    def from_items(cls, items, typecode=None):
+        """Balanced bulk build, like BST.from_items. Nodes are numbered in
+        key order, so every node's values end up in one contiguous run."""
+        tree = cls(typecode)
+        for key, val in sorted(items, key=lambda item: item[0]):
+            i = len(tree.keys) - 1
+            if i < 0 or tree.keys[i] != key:
+                i = tree._new_node(key)
+            tree._append_value(i, val)
+        tree.root = tree._build(0, len(tree.keys))
+        return tree
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self.left[mid] = self._build(lo, mid)
+        self.right[mid] = self._build(mid + 1, hi)
+        self.size[mid] += self._size(self.left[mid]) + self._size(self.right[mid])
+        self.count[mid] += self._count(self.left[mid]) + self._count(self.right[mid])
+        return mid
+
+    def _new_node(self, key):
+        self.keys.append(key)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.size.append(0)
+        self.count.append(1)
+        self.first.append(-1)
+        self.last.append(-1)
+        return len(self.keys) - 1
 
-        current = self.root
-        while current or stack:
-            while current:
-                stack.append(current)
-                current = current.right
+    def _append_value(self, i, val):
+        slot = len(self.values)
+        self.values.append(val)
+        self.next.append(-1)
+        if self.first[i] == -1:
+            self.first[i] = slot
+        else:
+            self.next[self.last[i]] = slot
+        self.last[i] = slot
+        self.size[i] += 1
+
+    def _node_values(self, i):
+        values = []
+        slot = self.first[i]
+        while slot != -1:
+            values.append(self.values[slot])
+            slot = self.next[slot]
+        return values
+
+    def _size(self, i):
+        return self.size[i] if i != -1 else 0
+
+    def _count(self, i):
+        return self.count[i] if i != -1 else 0
+
+    def _find(self, key):
+        i = self.root
+        while i != -1:
+            if key < self.keys[i]:
+                i = self.left[i]
+            elif key > self.keys[i]:
+                i = self.right[i]
+            else:
+                return i
+        return -1
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        return self._node_values(i) if i != -1 else []
+
+    def __len__(self):
+        return self._size(self.root)
 
-            current = stack.pop()
-            visited.append(current.key)
-            if len(visited) == n:
+    def dump(self):
+        for key, values in self.items():
+            print(key, ":", values)
+
+    def add(self, key, val):
+        if self.root == -1:
+            self.root = self._new_node(key)
+
+        path = []
+        i = self.root
+        created = False
+        while True:
+            path.append(i)
+            if key < self.keys[i]:
+                if self.left[i] == -1:
+                    self.left[i] = self._new_node(key)
+                    created = True
+                i = self.left[i]
+            elif key > self.keys[i]:
+                if self.right[i] == -1:
+                    self.right[i] = self._new_node(key)
+                    created = True
+                i = self.right[i]
+            else:
                 break
 
-            current = current.left
+        self._append_value(i, val)
+        for j in path:
+            if j != i:
+                self.size[j] += 1
+                if created:
+                    self.count[j] += 1
+
+    def __iter__(self):
+        for i in self._walk():
+            yield self.keys[i]
+
+    def __reversed__(self):
+        for i in self._walk(reverse=True):
+            yield self.keys[i]
+
+    def items(self, reverse=False):
+        for i in self._walk(reverse=reverse):
+            yield self.keys[i], self._node_values(i)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """Yield the values for every key with lo <= key <= hi, in key
+        order (descending if reverse). Either bound may be None."""
+        for i in self._walk(lo, hi, reverse):
+            slot = self.first[i]
+            while slot != -1:
+                yield self.values[slot]
+                slot = self.next[slot]
+
+    def _walk(self, lo=None, hi=None, reverse=False):
+        # same pruned in-order walk as BST._walk, over node indices
+        keys = self.keys
+        stack = []
+        i = self.root
+        while stack or i != -1:
+            while i != -1:
+                if not reverse and lo is not None and keys[i] < lo:
+                    i = self.right[i]
+                elif reverse and hi is not None and keys[i] > hi:
+                    i = self.left[i]
+                else:
+                    stack.append(i)
+                    i = self.right[i] if reverse else self.left[i]
+
+            if not stack:
+                return
+            i = stack.pop()
+            if not reverse and hi is not None and keys[i] > hi:
+                return
+            if reverse and lo is not None and keys[i] < lo:
+                return
+            yield i
+            i = self.left[i] if reverse else self.right[i]
+
+    def get_height(self, node=None):
+        # iterative, so degenerate (sorted-input) trees are fine too
+        if node is None:
+            node = self.root
+        height = 1
+        stack = [(node, 1)]
+        while stack:
+            i, depth = stack.pop()
+            if i == -1:
+                height = max(height, depth)
+                continue
+            stack.append((self.left[i], depth + 1))
+            stack.append((self.right[i], depth + 1))
+        return height
+
+    def num_nodes(self, node=None):
+        return self._count(self.root)
+
+    def num_leaf_nodes(self):
+        return sum(1 for i in range(len(self.keys))
+                   if self.left[i] == -1 and self.right[i] == -1)
+
+    def num_nonleaf_nodes(self, node=None):
+        return self.num_nodes() - self.num_leaf_nodes()
+
+    def find_keys(self, n):
+        """Return the n-th largest key (the smallest key if n is out of
+        range, None for an empty tree)."""
+        if self.root == -1:
+            return None
+        if n < 1 or n > self.count[self.root]:
+            n = self.count[self.root]
+
+        i = self.root
+        while True:
+            right = self._count(self.right[i])
+            if n <= right:
+                i = self.right[i]
+            elif n == right + 1:
+                return self.keys[i]
+            else:
+                n -= right + 1
+                i = self.left[i]
+
+    def rank(self, key):
+        """Number of values stored under keys smaller than key."""
+        below = 0
+        i = self.root
+        while i != -1:
+            if key < self.keys[i]:
+                i = self.left[i]
+            elif key > self.keys[i]:
+                below += self.size[i] - self._size(self.right[i])
+                i = self.right[i]
+            else:
+                return below + self._size(self.left[i])
+        return below
+
+    def select(self, i):
+        """Key of the i-th smallest value (0-based, counting duplicates)."""
+        if i < 0:
+            i += len(self)
+        node = self.root
+        while node != -1:
+            left = self._size(self.left[node])
+            here = self.size[node] - left - self._size(self.right[node])
+            if i < left:
+                node = self.left[node]
+            elif i < left + here:
+                return self.keys[node]
+            else:
+                i -= left + here
+                node = self.right[node]
+        raise IndexError("BST index out of range")
+
+    def percentile(self, p):
+        """Nearest-rank p-th percentile (0 <= p <= 100) of the keys,
+        weighted by how many values each key holds."""
+        if not 0 <= p <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if self.root == -1:
+            return None
+        k = math.ceil(p / 100 * len(self))
+        return self.select(max(k, 1) - 1)
+
+
+INDEX_MAGIC = b"BSTIDX01"
+INDEX_HEADER = struct.Struct("<8sQQ")  # magic, number of keys, keys per page
+
+
+def save_index(tree, path, page_size=512):
+    """Write any of the trees above to path as a read-only index that
+    DiskBST can mmap. Keys must be numbers (e.g. a Loan attribute such as
+    interest_rate); each key's values are pickled together.
+
+    Layout, all little-endian, every section 8-byte aligned:
+        header
+        fence    first key of every page (float64)
+        keys     sorted keys, page_size per page (float64)
+        counts   running number of values before each key (uint64, n+1)
+        offsets  start of each key's pickle in the blob (uint64, n+1)
+        blob     pickled value lists
+    """
+    n = tree.num_nodes()
+    pages = math.ceil(n / page_size)
+    blob_start = INDEX_HEADER.size + 8 * (pages + n + 2 * (n + 1))
+
+    keys = array("d")
+    counts = array("Q", [0])
+    offsets = array("Q", [0])
+    with open(path, "wb") as f:
+        f.seek(blob_start)
+        for key, values in tree.items():
+            keys.append(float(key))
+            counts.append(counts[-1] + len(values))
+            offsets.append(offsets[-1] + f.write(pickle.dumps(values, pickle.HIGHEST_PROTOCOL)))
+
+        f.seek(0)
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, n, page_size))
+        f.write(keys[::page_size].tobytes())
+        f.write(keys.tobytes())
+        f.write(counts.tobytes())
+        f.write(offsets.tobytes())
+
+
+class DiskBST():
+    """Read-only view of an index written by save_index.
+
+    The file is memory-mapped, so opening it is O(1) and a lookup touches
+    one fence entry per level of binary search plus a single page of keys;
+    the OS pages data in as it is needed instead of the whole index being
+    read up front.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n, self.page_size = INDEX_HEADER.unpack_from(self.map)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a BST index file")
+
+        n = self.n
+        pages = math.ceil(n / self.page_size)
+        view = memoryview(self.map)
+        start = INDEX_HEADER.size
+        self.fence = view[start:start + 8 * pages].cast("d")
+        start += 8 * pages
+        self.keys = view[start:start + 8 * n].cast("d")
+        start += 8 * n
+        self.counts = view[start:start + 8 * (n + 1)].cast("Q")
+        start += 8 * (n + 1)
+        self.offsets = view[start:start + 8 * (n + 1)].cast("Q")
+        self.blob_start = start + 8 * (n + 1)
+
+    def close(self):
+        # drop the memoryviews first, or mmap refuses to close
+        for name in ("fence", "keys", "counts", "offsets"):
+            if hasattr(self, name):
+                getattr(self, name).release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _values(self, i):
+        lo = self.blob_start + self.offsets[i]
+        hi = self.blob_start + self.offsets[i + 1]
+        return pickle.loads(self.map[lo:hi])
+
+    def _bisect(self, key, right=False):
+        # pick the page from the fence, then search inside that page only
+        find = bisect.bisect_right if right else bisect.bisect_left
+        page = max(find(self.fence, key) - 1, 0)
+        lo = page * self.page_size
+        hi = min(lo + self.page_size, self.n)
+        return find(self.keys, key, lo, hi)
+
+    def __getitem__(self, key):
+        i = self._bisect(key)
+        if i < self.n and self.keys[i] == key:
+            return self._values(i)
+        return []
+
+    def __len__(self):
+        return self.counts[self.n]
+
+    def num_nodes(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __reversed__(self):
+        for i in range(self.n - 1, -1, -1):
+            yield self.keys[i]
+
+    def items(self, reverse=False):
+        order = range(self.n - 1, -1, -1) if reverse else range(self.n)
+        for i in order:
+            yield self.keys[i], self._values(i)
+
+    def range(self, lo=None, hi=None, reverse=False):
+        """Yield the values for every key with lo <= key <= hi, in key
+        order (descending if reverse). Either bound may be None."""
+        start = self._bisect(lo) if lo is not None else 0
+        stop = self._bisect(hi, right=True) if hi is not None else self.n
+        order = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        for i in order:
+            yield from self._values(i)
+
+    def find_keys(self, n):
+        if self.n == 0:
+            return None
+        if n < 1 or n > self.n:
+            n = self.n
+        return self.keys[self.n - n]
+
+    def rank(self, key):
+        """Number of values stored under keys smaller than key."""
+        return self.counts[self._bisect(key)]
+
+    def select(self, i):
+        """Key of the i-th smallest value (0-based, counting duplicates)."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("BST index out of range")
+        return self.keys[bisect.bisect_right(self.counts, i) - 1]
 
-        return visited[-1] if len(visited) > 0 else None
-    
\ No newline at end of file
+    def percentile(self, p):
+        """Nearest-rank p-th percentile (0 <= p <= 100) of the keys,
+        weighted by how many values each key holds."""
+        if not 0 <= p <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if self.n == 0:
+            return None
+        k = math.ceil(p / 100 * len(self))
+        return self.select(max(k, 1) - 1)
@@ -4,14 +4,122 @@
 # hours: 8
 
 from collections import deque
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+import codecs
+import hashlib
+import itertools
+import json
 import os
+import pickle
+import re
+import numpy as np
 import pandas as pd
+import threading
 import time
 import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 
+class HostRateLimiter:
+    """Spaces out requests to the same host to at most rate per second,
+    across all the threads sharing it."""
+
+    def __init__(self, rate):
+        self.delay = 1 / rate
+        self.lock = threading.Lock()
+        self.next_time = {}
+
+    def wait(self, url):
+        host = urlparse(str(url)).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time.get(host, now))
+            self.next_time[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class LinkParser(HTMLParser):
+    """Collects absolute <a href> URLs from HTML fed in chunks."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "base":
+            href = dict(attrs).get("href")
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.urls.append(urljoin(self.base_url, href))
+
+
+CHARSET_RE = re.compile(rb"""charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+META_RE = re.compile(rb"<meta[^>]*>", re.IGNORECASE)
+
+
+def declared_charset(content_type, head):
+    """The page's charset from the HTTP Content-Type header, else from a
+    <meta> tag in the first 1024 bytes (as browsers do), else None. Unlike
+    response.encoding, a text/html header without a charset does not mean
+    ISO-8859-1 here."""
+    match = CHARSET_RE.search(content_type.encode("latin-1", "replace"))
+    if match is None:
+        for meta in META_RE.findall(head[:1024]):
+            match = CHARSET_RE.search(meta)
+            if match:
+                break
+    if match is None:
+        return None
+    try:
+        return codecs.lookup(match.group(1).decode("ascii")).name
+    except LookupError:
+        return None
+
+
+class NodeCache:
+    """On-disk cache of what a searcher learned about each node: its
+    children, a result (page HTML, node value, ...) and a validator (ETag
+    or mtime) to check the entry is still fresh. One pickle file per node
+    under directory. Any object with the same get/put methods can be
+    passed to the searchers instead."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, node):
+        return os.path.join(self.directory, hashlib.sha1(repr(node).encode()).hexdigest())
+
+    def get(self, node):
+        try:
+            with open(self.path(node), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry if entry.get("node") == node else None
+
+    def put(self, node, validator, children, result):
+        entry = {"node": node, "validator": validator, "children": children, "result": result}
+        write_atomic(self.path(node), entry)
+
+
+def write_atomic(path, obj):
+    # write then rename, so a crash never leaves half a file behind
+    tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
 class GraphSearcher:
     def __init__(self):
         self.visited = set()
@@ -24,18 +132,70 @@ class GraphSearcher:
         """
         raise Exception("must be overridden in sub classes -- don't change me here!")
 
+    def fetch(self, node):
+        """ Load a node without touching the searcher's state, so it can run
+        on a worker thread (used by concurrent_bfs_search)
+        param: node
+        return: (children, result), where result is handed to record()
+        """
+        raise Exception("sub classes must override fetch to support concurrent_bfs_search")
+
+    def record(self, node, result):
+        """ Store what fetch returned for node; always called in BFS order
+        """
+        self.order.append(node)
+
     def dfs_search(self, node):
         self.visited.clear()
         self.order.clear()
         self.dfs_visit(node)
         
     def dfs_visit(self, node):
+        for _ in self.walk_dfs(node):
+            pass
+
+    def iter_dfs(self, node, max_depth=None, max_nodes=None, keep_order=True):
+        """ Generator version of dfs_search: yields each node as it is visited,
+        in the same order. Stop early by breaking out of the loop, or with
+        max_depth (the start node is depth 0) / max_nodes. With
+        keep_order=False, self.order only holds the current node's entry,
+        so memory stays flat on huge graphs.
+        """
+        self.visited.clear()
+        self.order.clear()
+        yield from self.walk_dfs(node, max_depth, max_nodes, keep_order)
+
+    def walk_dfs(self, node, max_depth=None, max_nodes=None, keep_order=True):
+        # explicit stack of children iterators instead of recursion, so deep
+        # graphs can't hit the recursion limit
         if node in self.visited:
             return
-        self.visited.add(node)
-        children = self.visit_and_get_children(node)
-        for child in children:
-            self.dfs_visit(child)
+        stack = []
+        count = 0
+        depth = 0
+        while True:
+            if not keep_order:
+                self.order.clear()
+            self.visited.add(node)
+            children = self.visit_and_get_children(node)
+            yield node
+            count += 1
+            if max_nodes is not None and count >= max_nodes:
+                return
+            if max_depth is None or depth < max_depth:
+                stack.append((iter(children), depth + 1))
+
+            node = None
+            while stack and node is None:
+                children, depth = stack[-1]
+                for child in children:
+                    if child not in self.visited:
+                        node = child
+                        break
+                else:
+                    stack.pop()
+            if node is None:
+                return
             
     def bfs_search(self, node):
         self.visited.clear()
@@ -52,14 +212,152 @@ class GraphSearcher:
                 if child not in self.visited:
                     self.visited.add(child)
                     queue.append(child)
+
+    def resumable_bfs_search(self, node, checkpoint, every=100):
+        """ bfs_search that saves its queue, visited set and order to the
+        checkpoint file every `every` visits. If a checkpoint for the same
+        start node exists, the search picks up where it stopped instead of
+        starting over. The file is removed once the search finishes.
+        """
+        state = None
+        if os.path.exists(checkpoint):
+            with open(checkpoint, "rb") as f:
+                state = pickle.load(f)
+            if state["start"] != node:
+                state = None
+
+        if state is None:
+            self.visited = {node}
+            self.order = []
+            queue = deque([node])
+        else:
+            self.visited = state["visited"]
+            self.order = state["order"]
+            queue = state["queue"]
+            self.restore_checkpoint(state["extra"])
+
+        visits = 0
+        while queue:
+            current_node = queue.popleft()
+            children = self.visit_and_get_children(current_node)
+            for child in children:
+                if child not in self.visited:
+                    self.visited.add(child)
+                    queue.append(child)
+            visits += 1
+            if visits % every == 0:
+                write_atomic(checkpoint, {"start": node, "queue": queue, "visited": self.visited,
+                                          "order": self.order, "extra": self.checkpoint_state()})
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    def checkpoint_state(self):
+        """ Extra sub class state to save with a checkpoint
+        """
+        return None
+
+    def restore_checkpoint(self, extra):
+        pass
+
+    def iter_bfs(self, node, max_depth=None, max_nodes=None, keep_order=True):
+        """ Generator version of bfs_search, with the same options as iter_dfs
+        """
+        self.visited.clear()
+        self.order.clear()
+        self.visited.add(node)
+        queue = deque([(node, 0)])
+        count = 0
+        while queue:
+            current_node, depth = queue.popleft()
+            if not keep_order:
+                self.order.clear()
+            children = self.visit_and_get_children(current_node)
+            yield current_node
+            count += 1
+            if max_nodes is not None and count >= max_nodes:
+                return
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for child in children:
+                if child not in self.visited:
+                    self.visited.add(child)
+                    queue.append((child, depth + 1))
+
+    def concurrent_bfs_search(self, node, workers=8, per_host_rate=None):
+        """ BFS with up to `workers` fetches in flight at once, and at most
+        per_host_rate fetches per second to any one host. The nodes at the
+        front of the queue are fetched ahead on a thread pool, but results
+        are recorded and expanded strictly in queue order, so self.order
+        comes out exactly as bfs_search would produce it. Only this thread
+        touches self.visited and self.order.
+        """
+        self.visited.clear()
+        self.order.clear()
+        self.visited.add(node)
+        queue = deque([node])
+        pending = deque()
+        limiter = HostRateLimiter(per_host_rate) if per_host_rate else None
+
+        with ThreadPoolExecutor(workers) as pool:
+            while queue or pending:
+                while queue and len(pending) < workers:
+                    current_node = queue.popleft()
+                    pending.append((current_node, pool.submit(self.limited_fetch, current_node, limiter)))
+
+                current_node, future = pending.popleft()
+                children, result = future.result()
+                self.record(current_node, result)
+                for child in children:
+                    if child not in self.visited:
+                        self.visited.add(child)
+                        queue.append(child)
+
+    def limited_fetch(self, node, limiter):
+        if limiter is not None:
+            limiter.wait(node)
+        return self.fetch(node)
         
         
 class MatrixSearcher(GraphSearcher):
-    def __init__(self, df):
+    def __init__(self, df, sparse=False):
+        """ sparse: convert df once to CSR (compressed sparse row) arrays, so
+        a visit costs O(children) instead of a scan of the whole row, and
+        bfs_search expands a whole frontier at once with NumPy. Works with
+        pandas sparse columns, so the dense matrix never has to exist.
+        """
         super().__init__() # call constructor method of parent class
         self.df = df
+        self.sparse = sparse
+        if sparse:
+            self.build_csr()
+
+    def build_csr(self):
+        rows = []
+        cols = []
+        for j, col in enumerate(self.df.columns):
+            hits = column_hits(self.df.iloc[:, j])
+            rows.append(hits)
+            cols.append(np.full(len(hits), j))
+        rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.array([], dtype=np.int64)
+
+        by_row = np.lexsort((cols, rows))
+        self.indices = cols[by_row]
+        self.indptr = np.searchsorted(rows[by_row], np.arange(len(self.df.index) + 1))
+        self.row_labels = list(self.df.index)
+        self.col_labels = list(self.df.columns)
+        self.row_of = {label: i for i, label in enumerate(self.row_labels)}
+        # a child (column) is visited through the row with the same label
+        self.col_to_row = np.array([self.row_of.get(label, -1) for label in self.col_labels],
+                                   dtype=np.int64)
 
     def visit_and_get_children(self, node):
+        if self.sparse:
+            i = self.row_of[node]
+            children = [self.col_labels[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+            self.order.append(node)
+            return children
+
         children = []
         for col, value in self.df.loc[node].items():
             if value == 1:
@@ -67,19 +365,121 @@ class MatrixSearcher(GraphSearcher):
         self.order.append(node) 
         return children
 
+    def bfs_search(self, node):
+        if not self.sparse:
+            return super().bfs_search(node)
+
+        # level by level: gather every child of the frontier in queue order,
+        # then keep the first occurrence of each unvisited one -- exactly the
+        # order a queue-based BFS would append them in
+        self.visited.clear()
+        self.order.clear()
+        seen = np.zeros(len(self.row_labels), dtype=bool)
+        start = self.row_of[node]
+        seen[start] = True
+        order = [np.array([start])]
+        frontier = order[0]
+        while frontier.size:
+            starts = self.indptr[frontier]
+            counts = self.indptr[frontier + 1] - starts
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            cols = self.indices[np.repeat(starts, counts) + offsets]
+            children = self.col_to_row[cols]
+            if (children < 0).any():
+                raise KeyError(self.col_labels[cols[children < 0][0]])
+
+            children = children[~seen[children]]
+            _, first = np.unique(children, return_index=True)
+            frontier = children[np.sort(first)]
+            seen[frontier] = True
+            order.append(frontier)
+
+        self.order.extend(self.row_labels[i] for i in np.concatenate(order))
+        self.visited.update(self.order)
+
+
+def column_hits(column):
+    """ Positions where a DataFrame column equals 1, without densifying
+    pandas sparse columns
+    """
+    values = column.array
+    if isinstance(values, pd.arrays.SparseArray) and values.fill_value != 1:
+        return values.sp_index.indices[values.sp_values == 1].astype(np.int64)
+    return np.flatnonzero(column.to_numpy() == 1)
+
 
 class FileSearcher(GraphSearcher):
     
-    def __init__(self):
+    def __init__(self, directory="file_nodes", workers=None, index=None, disk_cache=None):
+        """ workers: bfs_search reads the nodes at the front of the queue on
+        this many threads (see concurrent_bfs_search)
+        index: file written by build_index, to load every node up front
+        disk_cache: a NodeCache; entries are reused while the node file's
+        mtime is unchanged
+        Parsed nodes are kept in self.cache, so repeated searches over the
+        same files don't touch the disk again.
+        """
         super().__init__()
+        self.directory = directory
+        self.workers = workers
+        self.disk_cache = disk_cache
+        self.cache = {}
+        if index is not None:
+            self.load_index(index)
+
+    def read_node(self, node):
+        cached = self.cache.get(node)
+        if cached is None:
+            file_path = os.path.join(self.directory, node)
+            if self.disk_cache is not None:
+                mtime = os.stat(file_path).st_mtime_ns
+                entry = self.disk_cache.get(node)
+                if entry is not None and entry["validator"] == mtime:
+                    cached = (entry["result"], entry["children"])
+            if cached is None:
+                with open(file_path, "r") as file:
+                    value = file.readline().strip()
+                    children = file.readline().strip().split(',')
+                cached = (value, children)
+                if self.disk_cache is not None:
+                    self.disk_cache.put(node, mtime, children, value)
+            self.cache[node] = cached
+        return cached
 
     def visit_and_get_children(self, node):
-        file_path = os.path.join("file_nodes", node)
-        with open(file_path, "r") as file:
-            value = file.readline().strip()
-            children = file.readline().strip().split(',')
-            self.order.append(value)
-            return children
+        value, children = self.read_node(node)
+        self.order.append(value)
+        return list(children)
+
+    def fetch(self, node):
+        value, children = self.read_node(node)
+        return list(children), value
+
+    def record(self, node, value):
+        self.order.append(value)
+
+    def bfs_search(self, node):
+        if self.workers:
+            return self.concurrent_bfs_search(node, self.workers)
+        return super().bfs_search(node)
+
+    @staticmethod
+    def build_index(directory, path):
+        """ Parse every node file in directory once and save them all to a
+        single JSON file, {node: [value, children]}
+        """
+        searcher = FileSearcher(directory)
+        nodes = {}
+        for name in sorted(os.listdir(directory)):
+            if os.path.isfile(os.path.join(directory, name)):
+                nodes[name] = list(searcher.read_node(name))
+        with open(path, "w") as f:
+            json.dump(nodes, f, separators=(",", ":"))
+
+    def load_index(self, path):
+        with open(path) as f:
+            for node, (value, children) in json.load(f).items():
+                self.cache[node] = (value, children)
 
     def concat_order(self):
         return ''.join(self.order)
@@ -87,26 +487,164 @@ class FileSearcher(GraphSearcher):
     
 class WebSearcher(GraphSearcher):
     
-    def __init__(self, driver):
+    def __init__(self, driver=None, driver_factory=None, backend="selenium",
+                 tables=True, pool_size=16, disk_cache=None):
+        """ driver_factory: callable returning a new WebDriver; needed for
+        concurrent_bfs_search, since a WebDriver can't be shared by threads
+        backend: "selenium" drives a browser (needed for pages built by
+        JavaScript); "http" fetches static pages over a pooled keep-alive
+        session and pulls links out with a streaming parser, no browser
+        tables: keep pages for table(); they are only parsed when it's called
+        disk_cache: a NodeCache of pages already crawled. The http backend
+        revalidates entries with their ETag / Last-Modified; the selenium
+        backend has no cheap way to check, so it trusts them. With a cache,
+        table() is built from it, so it also covers pages visited before a
+        resumed crawl.
+        """
         super().__init__()
+        if backend not in ("selenium", "http"):
+            raise ValueError(f"unknown backend {backend!r}")
         self.driver = driver
+        self.driver_factory = driver_factory
+        self.backend = backend
+        self.keep_tables = tables
+        self.disk_cache = disk_cache
         self.tables = []
+        self.local = threading.local()
+        self.worker_drivers = []
+
+        if backend == "http":
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
 
     def visit_and_get_children(self, node):
-        self.order.append(node)
-        self.driver.get(node)
+        if self.backend == "http":
+            children, page = self.http_load(node)
+        else:
+            children, page = self.load(self.driver, node)
+        self.record(node, page)
+        return children
+
+    def load(self, driver, node):
+        if self.disk_cache is not None:
+            entry = self.disk_cache.get(node)
+            if entry is not None:
+                return entry["children"], entry["result"]
+
+        driver.get(node)
         urls = []
-        elements = self.driver.find_elements(By.TAG_NAME, "a")
+        elements = driver.find_elements(By.TAG_NAME, "a")
         for element in elements:
             url = element.get_attribute('href')
             if url:
                 urls.append(url)
-        tables = pd.read_html(self.driver.page_source)
-        relevant_table = tables[0]
-        self.tables.append(relevant_table)
-        return urls
+        page = driver.page_source if self.keep_tables else None
+        if self.disk_cache is not None:
+            self.disk_cache.put(node, None, urls, page)
+        return urls, page
+
+    def http_load(self, node):
+        entry = self.disk_cache.get(node) if self.disk_cache is not None else None
+        headers = {}
+        if entry is not None and entry["validator"]:
+            etag, last_modified = entry["validator"]
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        parser = LinkParser(node)
+        chunks = [] if self.keep_tables else None
+        with self.session.get(node, stream=True, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                return entry["children"], entry["result"]
+            response.raise_for_status()
+            validator = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            parser.base_url = response.url
+            raw = response.iter_content(chunk_size=16384)
+            content_type = response.headers.get("Content-Type", "")
+            head = b""
+            if not CHARSET_RE.search(content_type.encode("latin-1", "replace")):
+                # no charset in the header: read enough to look for <meta>
+                for chunk in raw:
+                    head += chunk
+                    if len(head) >= 1024:
+                        break
+            encoding = declared_charset(content_type, head)
+            if encoding is None:
+                # nothing declared: guess from the whole page, like
+                # response.apparent_encoding
+                head += b"".join(raw)
+                encoding = requests.compat.chardet.detect(head)["encoding"] or "utf-8"
+                try:
+                    encoding = codecs.lookup(encoding).name
+                except LookupError:
+                    encoding = "utf-8"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            for chunk in itertools.chain([head], raw):
+                text = decoder.decode(chunk)
+                parser.feed(text)
+                if chunks is not None:
+                    chunks.append(text)
+            text = decoder.decode(b"", final=True)
+            parser.feed(text)
+            if chunks is not None:
+                chunks.append(text)
+        parser.close()
+        page = "".join(chunks) if chunks is not None else None
+        if self.disk_cache is not None:
+            self.disk_cache.put(node, validator if any(validator) else None, parser.urls, page)
+        return parser.urls, page
+
+    def fetch(self, node):
+        if self.backend == "http":
+            return self.http_load(node)
+
+        driver = getattr(self.local, "driver", None)
+        if driver is None:
+            if self.driver_factory is None:
+                raise ValueError("concurrent_bfs_search needs a driver_factory")
+            driver = self.driver_factory()
+            self.local.driver = driver
+            self.worker_drivers.append(driver)
+        return self.load(driver, node)
+
+    def record(self, node, page):
+        self.order.append(node)
+        if page is not None:
+            self.tables.append(page)
+
+    def concurrent_bfs_search(self, node, workers=8, per_host_rate=None):
+        self.local = threading.local()
+        try:
+            super().concurrent_bfs_search(node, workers, per_host_rate)
+        finally:
+            for driver in self.worker_drivers:
+                driver.quit()
+            self.worker_drivers.clear()
+
+    def checkpoint_state(self):
+        # with a disk cache, table() rebuilds everything from it
+        return None if self.disk_cache is not None else self.tables
+
+    def restore_checkpoint(self, extra):
+        if extra is not None:
+            self.tables = extra
 
     def table(self):
+        if self.disk_cache is not None:
+            pages = []
+            for node in self.order:
+                entry = self.disk_cache.get(node)
+                if entry is not None and entry["result"] is not None:
+                    pages.append(entry["result"])
+            return pd.concat([pd.read_html(StringIO(page))[0] for page in pages], ignore_index=True)
+
+        # pages are stored as HTML and parsed here, the first time they're needed
+        self.tables = [pd.read_html(StringIO(page))[0] if isinstance(page, str) else page
+                       for page in self.tables]
         return pd.concat(self.tables, ignore_index=True)
     
 def reveal_secrets(driver, url, travellog):
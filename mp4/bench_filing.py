@@ -0,0 +1,57 @@
+# Throughput of Filing parsing over the HTML filings in docs.zip, in MB/s
+# of (uncompressed) HTML.
+#
+#   python bench_filing.py [docs.zip]
+
+import re
+import sys
+import time
+from zipfile import ZipFile
+
+from edgar_utils import Filing
+
+
+def eager_parse(html_bytes):
+    # how Filing used to be built: decode everything, then run all three
+    # scans with uncompiled patterns
+    html = html_bytes.decode('utf-8')
+    re.findall(r'\b(?:19|20)\d{2}-\d{2}-\d{2}\b', html)
+    re.search(r'SIC=(\d+)', html)
+    for addr_html in re.findall(r'<div class="mailer">(.*?)</div>', html, re.DOTALL):
+        re.findall(r'<span class="mailerAddress">(.*?)</span>', addr_html, re.DOTALL)
+
+
+def all_fields(html_bytes):
+    filing = Filing(html_bytes)
+    filing.dates, filing.sic, filing.addresses
+
+
+def sic_only(html_bytes):
+    Filing(html_bytes).sic
+
+
+def decoded_sic_only(html_bytes):
+    Filing(html_bytes.decode('utf-8')).sic
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "docs.zip"
+    with ZipFile(path) as zf:
+        docs = [zf.read(name) for name in zf.namelist()
+                if name.endswith('.htm') or name.endswith('.html')]
+    size = sum(len(doc) for doc in docs) / 2**20
+    print(f"{len(docs)} filings, {size:.1f} MB of HTML")
+
+    for name, parse in [("eager, decoded (old)", eager_parse),
+                        ("Filing, all fields", all_fields),
+                        ("Filing, .sic only (str)", decoded_sic_only),
+                        ("Filing, .sic only (bytes)", sic_only)]:
+        start = time.perf_counter()
+        for doc in docs:
+            parse(doc)
+        elapsed = time.perf_counter() - start
+        print(f"{name:28} {size / elapsed:9.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
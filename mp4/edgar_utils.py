@@ -1,46 +1,306 @@
+import functools
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import ZipFile
+import numpy as np
 import pandas as pd
-from bisect import bisect
 import re
 
-ips = pd.read_csv("ip2location.csv")
+IP_CSV = "ip2location.csv"
+IP_CACHE = "ip2location"  # prefix of the .npy cache files
+DOCS_ZIP = "docs.zip"
+FILING_INDEX = "docs_index.json"
+
+_ranges = None
+_ranges_mtime = None
+_ips = None
+
+def cache_path(part):
+    return f"{IP_CACHE}.{part}.npy"
+
+def load_ranges():
+    """(high, codes, labels) from ip2location.csv, loaded on first use.
+
+    high is the contiguous uint32 high column. Regions are dictionary
+    encoded: codes[i] is the index into labels of row i's region.
+
+    The first load also saves each array as IP_CACHE.<part>.npy, stamped
+    with the CSV's mtime; later processes memory-map those instead of
+    parsing the CSV, until the CSV changes.
+    """
+    global _ranges, _ranges_mtime
+    mtime = os.stat(IP_CSV).st_mtime_ns
+    if _ranges is not None and _ranges_mtime == mtime:
+        return _ranges
+
+    parts = ('high', 'codes', 'labels')
+    if all(os.path.exists(cache_path(part)) and os.stat(cache_path(part)).st_mtime_ns == mtime
+           for part in parts):
+        # the labels are small; mapping them would only slow down str()
+        ranges = (np.load(cache_path('high'), mmap_mode='r'),
+                  np.load(cache_path('codes'), mmap_mode='r'),
+                  np.load(cache_path('labels')))
+    else:
+        df = pd.read_csv(IP_CSV)
+        codes, labels = pd.factorize(df['region'])
+        code_type = np.uint8 if len(labels) <= 1 << 8 else np.uint16 if len(labels) <= 1 << 16 else np.uint32
+        ranges = (df['high'].to_numpy(dtype=np.uint32),
+                  codes.astype(code_type),
+                  np.asarray(labels, dtype=str))
+        for part, array in zip(parts, ranges):
+            # write a new file and rename it over the old one: other
+            # processes may have the old one memory-mapped, and truncating
+            # it under them would crash them with SIGBUS
+            path = cache_path(part)
+            tmp = f"{path}.tmp{os.getpid()}.npy"
+            try:
+                np.save(tmp, array)
+                os.utime(tmp, ns=(mtime, mtime))
+                os.replace(tmp, path)
+            except OSError:
+                # read-only directory: just don't cache
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    _ranges, _ranges_mtime = ranges, mtime
+    region_of.cache_clear()
+    return ranges
+
+def __getattr__(name):
+    # old module-level names, now computed lazily
+    global _ips
+    if name == 'ips':
+        if _ips is None:
+            _ips = pd.read_csv(IP_CSV)
+        return _ips
+    if name == 'ips_high':
+        return load_ranges()[0]
+    if name == 'ips_region':
+        high, codes, labels = load_ranges()
+        return labels[codes]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def lookup_region(ip):
+    # load_ranges checks the CSV's mtime on every call, so the memo below
+    # never answers from a table that has since changed
+    load_ranges()
+    return region_of(ip, _ranges_mtime)
+
+@functools.lru_cache(maxsize=1 << 16)
+def region_of(ip, mtime):
+    # memoized: the same few IPs make up most of a real log. mtime is only
+    # part of the key, the table itself is load_ranges()'s
     ip_numeric = ''.join(c if c.isdigit() else '0' if c != '.' else '.' for c in ip)
     ip_to_int = lambda ip: sum(int(num) * (256 ** index) for index, num in enumerate(ip.split('.')[::-1]))
     vm_ip_int = ip_to_int(ip_numeric)
     
-    idx = bisect(ips['high'], vm_ip_int)
-    return ips.iloc[idx].region
+    high, codes, labels = load_ranges()
+    # a numpy uint32 key, so searchsorted doesn't cast the whole column
+    idx = len(high) if vm_ip_int > 0xFFFFFFFF else int(np.searchsorted(high, np.uint32(vm_ip_int), side='right'))
+    return str(labels[codes[idx]])
+
+def ips_to_ints(ip_list):
+    """Vectorized version of lookup_region's parsing: any character that
+    isn't a digit or '.' counts as '0' (EDGAR logs mask the last octet with
+    letters), then the octets are combined into one integer per address."""
+    arr = np.asarray(ip_list, dtype=str)
+    n = arr.size
+    width = arr.dtype.itemsize // 4
+    chars = arr.reshape(n).view(np.uint32).reshape(n, width) if width else np.zeros((n, 0), np.uint32)
+
+    result = np.zeros(n, dtype=np.uint64)
+    octet = np.zeros(n, dtype=np.uint64)
+    for col in chars.T:
+        dot = col == ord('.')
+        end = col == 0  # padding after the end of a shorter string
+        digit = np.where((col >= ord('0')) & (col <= ord('9')), col - ord('0'), 0).astype(np.uint64)
+        step = ~dot & ~end
+        octet = np.where(step, octet * 10 + digit, octet)
+        result = np.where(dot, result * 256 + octet, result)
+        octet = np.where(dot, 0, octet)
+    return result * 256 + octet
+
+def lookup_regions(ip_list):
+    """lookup_region for a whole array/Series of IPs in one pass, using
+    np.searchsorted on the high column. Returns an array, or a
+    Series with the same index when given a Series."""
+    high, codes, labels = load_ranges()
+    ints = ips_to_ints(ip_list)
+    # search with uint32 keys: uint64 ones would make searchsorted cast the
+    # whole column. Anything too big for uint32 is past the end of the table
+    idx = np.searchsorted(high, ints.astype(np.uint32), side='right')
+    idx[ints > 0xFFFFFFFF] = len(high)
+    regions = np.empty(len(idx), dtype=object)
+    found = idx < len(high)
+    regions[found] = labels[codes[idx[found]]].astype(object)
+    if isinstance(ip_list, pd.Series):
+        return pd.Series(regions, index=ip_list.index)
+    return regions
+
+def compile_patterns(kind):
+    # the same patterns for str and for bytes documents
+    enc = (lambda p: p.encode()) if kind is bytes else (lambda p: p)
+    return {
+        'date': re.compile(enc(r'\b(?:19|20)\d{2}-\d{2}-\d{2}\b')),
+        'sic': re.compile(enc(r'SIC=(\d+)')),
+        'mailer': re.compile(enc(r'<div class="mailer">(.*?)</div>'), re.DOTALL),
+        'line': re.compile(enc(r'<span class="mailerAddress">(.*?)</span>'), re.DOTALL),
+    }
+
+PATTERNS = {str: compile_patterns(str), bytes: compile_patterns(bytes)}
+STATE_RE = re.compile(r'\b[A-Z]{2}\s\d{5}\b')
+FIELDS = ('dates', 'sic', 'addresses')
+
+def as_text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
 
 class Filing:
+    """Fields of one EDGAR filing, parsed lazily.
+
+    html may be str or bytes (straight out of the zip, no decoding needed).
+    Each of dates, sic and addresses is extracted the first time it is
+    read, with precompiled patterns, so a caller that only wants .sic only
+    pays for one search. The document is dropped once all three are known.
+    """
+
     def __init__(self, html):
-        self.dates = self.extract_dates(html)
-        self.sic = self.extract_sic(html)
-        self.addresses = self.extract_addresses(html)
+        self.html = html
+        self.patterns = PATTERNS[bytes if isinstance(html, (bytes, bytearray, memoryview)) else str]
+
+    @functools.cached_property
+    def dates(self):
+        return self.parsed(self.extract_dates(self.html))
+
+    @functools.cached_property
+    def sic(self):
+        return self.parsed(self.extract_sic(self.html))
+
+    @functools.cached_property
+    def addresses(self):
+        return self.parsed(self.extract_addresses(self.html))
+
+    def parsed(self, value):
+        # cached_property stores the value after this returns, hence the -1
+        if sum(field in self.__dict__ for field in FIELDS) == len(FIELDS) - 1:
+            self.html = None
+        return value
 
     def state(self):
         for address in self.addresses:
-            match = re.search(r'\b[A-Z]{2}\s\d{5}\b', address)
+            match = STATE_RE.search(address)
             if match:
                 return match.group()[:2]
         return None
 
     def extract_dates(self, html):
-        dates = re.findall(r'\b(19|20)\d{2}-\d{2}-\d{2}\b', html)
+        dates = [as_text(date) for date in self.patterns['date'].findall(html)]
         return [date for date in dates if 1900 <= int(date[:4]) <= 2099]
 
     def extract_sic(self, html):
-        match = re.search(r'SIC=(\d+)', html)
+        match = self.patterns['sic'].search(html)
         return int(match.group(1)) if match else None
 
     def extract_addresses(self, html):
         addresses = []
-        for addr_html in re.findall(r'<div class="mailer">(.*?)</div>', html, re.DOTALL):
+        for addr_html in self.patterns['mailer'].findall(html):
             lines = []
-            for line in re.findall(r'<span class="mailerAddress">(.*?)</span>', addr_html, re.DOTALL):
-                stripped_line = line.strip()
+            for line in self.patterns['line'].findall(addr_html):
+                stripped_line = as_text(line).strip()
                 if stripped_line:  # Check if the stripped line is not empty
                     lines.append(stripped_line)
             if lines:  # Check if there are any non-empty lines
                 addresses.append("\n".join(lines))
         return addresses
+
+
+def is_filing(name):
+    return name.endswith('.htm') or name.endswith('.html')
+
+def zip_stamp(zip_path):
+    st = os.stat(zip_path)
+    return [st.st_mtime_ns, st.st_size]
+
+def parse_filings(args):
+    # worker: open the zip once and parse a batch of its filings
+    zip_path, names = args
+    rows = []
+    with ZipFile(zip_path) as zf:
+        for name in names:
+            filing = Filing(zf.read(name))
+            rows.append((name, [filing.sic, filing.state(), filing.dates, filing.addresses]))
+    return rows
+
+def build_filing_index(zip_path=DOCS_ZIP, processes=None):
+    """Parse every filing in zip_path with a pool of worker processes.
+
+    Returns {path: [sic, state, dates, addresses]}. Each worker opens the
+    zip itself and gets a batch of names, so only names and the small
+    parsed rows cross process boundaries, never the HTML.
+    """
+    with ZipFile(zip_path) as zf:
+        names = [name for name in zf.namelist() if is_filing(name)]
+    processes = processes or os.cpu_count() or 1
+    step = max(len(names) // (processes * 4) + 1, 16)
+    batches = [(zip_path, names[i:i + step]) for i in range(0, len(names), step)]
+
+    index = {}
+    if processes == 1 or len(batches) <= 1:
+        for batch in batches:
+            index.update(parse_filings(batch))
+        return index
+    # spawn, not fork: this can run on a background thread of the web
+    # server, and a forked child could inherit locks held by other threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        for part in pool.map(parse_filings, batches):
+            index.update(part)
+    return index
+
+_filing_index = None
+_filing_index_stamp = None
+_filing_index_lock = threading.Lock()
+
+def load_filing_index(zip_path=DOCS_ZIP, index_path=FILING_INDEX, processes=None):
+    """{path: [sic, state, dates, addresses]} for every filing in zip_path.
+
+    Built once by build_filing_index and saved to index_path along with the
+    zip's mtime and size; later calls (and later runs) reuse it until the
+    zip changes.
+    """
+    stamp = zip_stamp(zip_path)
+    if _filing_index is not None and _filing_index_stamp == stamp:
+        return _filing_index
+    # one build at a time; threads arriving meanwhile reuse its result
+    with _filing_index_lock:
+        return _load_filing_index(zip_path, index_path, processes)
+
+def _load_filing_index(zip_path, index_path, processes):
+    global _filing_index, _filing_index_stamp
+    stamp = zip_stamp(zip_path)
+    if _filing_index is not None and _filing_index_stamp == stamp:
+        return _filing_index
+
+    index = None
+    try:
+        with open(index_path) as f:
+            saved = json.load(f)
+        if saved.get('zip') == stamp:
+            index = saved['filings']
+    except (OSError, ValueError):
+        pass
+
+    if index is None:
+        index = build_filing_index(zip_path, processes)
+        try:
+            tmp = f"{index_path}.tmp{os.getpid()}"
+            with open(tmp, 'w') as f:
+                json.dump({'zip': stamp, 'filings': index}, f, separators=(',', ':'))
+            os.replace(tmp, index_path)
+        except OSError:
+            pass  # read-only directory: just don't cache
+
+    _filing_index, _filing_index_stamp = index, stamp
+    return index
@@ -6,10 +6,13 @@ import re
 from collections import Counter
 import geopandas as gpd
 import json
+import os
+import threading
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt 
 from shapely.geometry import Point, Polygon, box
+from edgar_utils import Filing, load_filing_index
 
 app = Flask(__name__)
 last_request_time = {}
@@ -92,53 +95,15 @@ def donate():
     return html
 
 
-class Filing:
-    def __init__(self, html):
-        self.dates = self.extract_dates(html)
-        self.sic = self.extract_sic(html)
-        self.addresses = self.extract_addresses(html)
-
-    def state(self):
-        for address in self.addresses:
-            match = re.search(r'\b[A-Z]{2}\s\d{5}\b', address)
-            if match:
-                return match.group()[:2]
-        return None
-
-    def extract_dates(self, html):
-        dates = re.findall(r'\b(19|20)\d{2}-\d{2}-\d{2}\b', html)
-        return [date for date in dates if 1900 <= int(date[:4]) <= 2099]
-
-    def extract_sic(self, html):
-        match = re.search(r'SIC=(\d+)', html)
-        return int(match.group(1)) if match else None
-
-    def extract_addresses(self, html):
-        addresses = []
-        for addr_html in re.findall(r'<div class="mailer">(.*?)</div>', html, re.DOTALL):
-            lines = []
-            for line in re.findall(r'<span class="mailerAddress">(.*?)</span>', addr_html, re.DOTALL):
-                stripped_line = line.strip()
-                if stripped_line:  # Check if the stripped line is not empty
-                    lines.append(stripped_line)
-            if lines:  # Check if there are any non-empty lines
-                addresses.append("\n".join(lines))
-        return addresses
-    
 def get_sic_from_filing(zip_file_name, file_name):
     with ZipFile(zip_file_name,'r') as z:
-        with z.open(filename) as f:
-            html_content = f.read().decode('utf-8')
-            filing = Filing(html_content)
-            return filing.sic
+        with z.open(file_name) as f:
+            # only .sic is read, so only the SIC pattern runs, on raw bytes
+            return Filing(f.read()).sic
             
 def count_addresses_in_filings():
-    filings = {}
-    with ZipFile("docs.zip") as zf:
-        for info in zf.filelist:
-            if info.filename.split(".")[-1] in ("htm","html"):
-                with zf.open(info.filename) as f:
-                    filings[info.filename] = Filing(str(f.read(), "utf-8"))
+    # path -> [sic, state, dates, addresses], parsed once per docs.zip
+    filings = load_filing_index("docs.zip")
     with ZipFile('server_log.zip', 'r') as server_zip:
         with server_zip.open('rows.csv') as log_file:
             data = pd.read_csv(log_file)
@@ -146,33 +111,89 @@ def count_addresses_in_filings():
     for row in data.itertuples():
         path = f"{int(row.cik)}/{row.accession}/{row.extention}" 
         if path in filings:
-            addresses.extend(filings[path].addresses)
+            addresses.extend(filings[path][3])
     counts = pd.Series(addresses).value_counts()
     return counts[counts >= 300].to_dict()
 
-@app.route("/analysis.html")
-def analysis():
+class ResultCache:
+    """The result of compute(), kept until one of the files in paths changes
+    (by mtime).
+
+    Once there is a value, get() never waits: if the inputs have changed it
+    returns the old value and starts one background thread to recompute it,
+    however many requests come in meanwhile. Only the very first get(), with
+    nothing cached yet, computes inline (other callers wait for that one).
+    """
+
+    def __init__(self, compute, paths):
+        self.compute = compute
+        self.paths = paths
+        self.lock = threading.Lock()
+        self.value = None
+        self.stamp = None
+        self.refreshing = False
+
+    def current_stamp(self):
+        return tuple(os.stat(path).st_mtime_ns for path in self.paths)
+
+    def get(self):
+        stamp = self.current_stamp()
+        if stamp == self.stamp:
+            return self.value
+        with self.lock:
+            if self.stamp is None:
+                self.value, self.stamp = self.compute(), stamp
+            elif stamp != self.stamp and not self.refreshing:
+                self.refreshing = True
+                threading.Thread(target=self.refresh, daemon=True).start()
+            return self.value
+
+    def refresh(self):
+        try:
+            # stamp taken before computing: if a file changes again while we
+            # work, the next get() sees a newer stamp and refreshes again
+            stamp = self.current_stamp()
+            value = self.compute()
+            with self.lock:
+                self.value, self.stamp = value, stamp
+        finally:
+            self.refreshing = False
+
+
+def top_ips():
     df_logs = pd.read_csv('server_log.zip', compression = 'zip')
     top_ips = df_logs.groupby('ip').size().sort_values(ascending = False).head(10).to_dict()
-    top_ips_str = ', '.join([f"'{ip}': {count}" for ip, count in top_ips.items()])
-    
-    sic_codes = []
-    with ZipFile('docs.zip', 'r') as z:
-        for filename in z.namelist():
-            if filename.endswith('.htm') or filename.endswith('.html'):
-                with z.open(filename) as f:
-                    html_content = f.read().decode('utf-8')
-                    filing = Filing(html_content)
-                    if filing.sic is not None:
-                        sic_codes.append(filing.sic)
-                        
+    return ', '.join([f"'{ip}': {count}" for ip, count in top_ips.items()])
+
+def sic_code_distribution():
+    filings = load_filing_index('docs.zip')
+    sic_codes = [sic for sic, state, dates, addresses in filings.values() if sic is not None]
     sic_code_distribution = pd.Series(sic_codes).value_counts().head(10).to_dict()
-    sic_code_distribution_str = "<br>".join([f"{sic}: {count}" for sic, count in sic_code_distribution.items()])
-    
-    common_addresses = count_addresses_in_filings()
+    return "<br>".join([f"{sic}: {count}" for sic, count in sic_code_distribution.items()])
 
-    dashboard_svg = generate_dashboard()
-    
+SHAPES = 'shapes/cb_2018_us_state_20m.shp'
+
+# each part of /analysis.html with the files it is computed from
+analysis_parts = [
+    ResultCache(top_ips, ['server_log.zip']),
+    ResultCache(sic_code_distribution, ['docs.zip']),
+    ResultCache(count_addresses_in_filings, ['server_log.zip', 'docs.zip']),
+    ResultCache(lambda: generate_dashboard(), ['locations.geojson', SHAPES, SHAPES[:-4] + '.dbf']),
+]
+analysis_page = (None, None)
+
+@app.route("/analysis.html")
+def analysis():
+    global analysis_page
+    parts = [cache.get() for cache in analysis_parts]
+    cached_parts, html = analysis_page
+    # re-render only when some part has been recomputed
+    if cached_parts is None or any(a is not b for a, b in zip(parts, cached_parts)):
+        html = render_analysis(*parts)
+        analysis_page = (parts, html)
+    return html
+
+def render_analysis(top_ips_str, sic_code_distribution_str, common_addresses, dashboard_svg):
     html_content = f"""
     <html>
     <head>